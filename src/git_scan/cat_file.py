@@ -0,0 +1,124 @@
+"""Module for the GitCatFile class."""
+
+import contextlib
+import pathlib
+import queue
+import subprocess
+import threading
+
+# Pipe buffer size in bytes.
+BUFFER_SIZE = 1 << 20
+
+# Largest request written without a reader thread, within any pipe buffer.
+INLINE_REQUEST_SIZE = 4096
+
+
+class GitCatFile:
+    """Class for reading objects through a persistent `git cat-file --batch` process."""
+
+    def __init__(self, repo_path: pathlib.Path):
+        self.repo_path = repo_path
+        self._process = None
+        self._pending = 0
+
+    def __enter__(self):
+        git_pipe = subprocess.PIPE
+        self._process = subprocess.Popen(
+            ["git", "cat-file", "--batch"],
+            stdin=git_pipe,
+            stdout=git_pipe,
+            bufsize=BUFFER_SIZE,
+            cwd=self.repo_path,
+        )
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        self.close(kill=exc_type is not None)
+
+    def close(self, kill: bool = False):
+        """Stop the cat-file process."""
+        if self._process is None:
+            return
+
+        # Git blocks writing output nobody reads, stop it instead of waiting.
+        if kill or self._pending:
+            self._process.kill()
+
+        with contextlib.suppress(BrokenPipeError):
+            self._process.stdin.close()
+        self._process.wait()
+        self._process.stdout.close()
+        self._process = None
+
+    def _read_payload(self):
+        """Read the next object from the process output, or None if it is unreadable."""
+        header = self._process.stdout.readline()
+        if not header:
+            raise RuntimeError("Unexpected end of git cat-file output")
+        self._pending -= 1
+
+        # Missing or ambiguous objects only get a "<name> <reason>" header.
+        parts = header.split()
+        if len(parts) != 3:
+            return None
+
+        # Payload is followed by a newline.
+        size = int(parts[2])
+        payload = self._process.stdout.read(size + 1)
+        if len(payload) != size + 1:
+            raise RuntimeError("Unexpected end of git cat-file output")
+
+        return payload[:-1]
+
+    def _read_payloads(self, count: int, results: queue.Queue):
+        """Move `count` objects from the process output to the results queue."""
+        # Forward any error, the consumer would otherwise wait forever.
+        try:
+            for _ in range(count):
+                results.put(self._read_payload())
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            results.put(error)
+
+    def read_many(self, object_hashes: list):
+        """Yield the raw contents of objects in the order they were requested.
+
+        All hashes are submitted at once while a reader thread consumes the
+        output, so git does not wait for Python between objects. Requests that
+        fit in the pipe buffer cannot block and are read without a thread.
+        """
+        if not object_hashes:
+            return
+
+        # Counted before the reader thread starts, it counts down.
+        self._pending += len(object_hashes)
+        request = b"\n".join(object_hashes) + b"\n"
+        if len(request) <= INLINE_REQUEST_SIZE:
+            self._process.stdin.write(request)
+            self._process.stdin.flush()
+            for object_hash in object_hashes:
+                payload = self._read_payload()
+                if payload is None:
+                    raise RuntimeError(f"Cannot read object: {object_hash.decode()}")
+                yield payload
+            return
+
+        results = queue.Queue()
+        reader = threading.Thread(
+            target=self._read_payloads,
+            args=(len(object_hashes), results),
+            daemon=True,
+        )
+        reader.start()
+
+        self._process.stdin.write(request)
+        self._process.stdin.flush()
+
+        for object_hash in object_hashes:
+            payload = results.get()
+            if isinstance(payload, Exception):
+                raise payload
+            if payload is None:
+                raise RuntimeError(f"Cannot read object: {object_hash.decode()}")
+            yield payload
+
+        reader.join()
@@ -2,29 +2,45 @@
 
 import datetime as dt
 
+# Timezone objects by offset string, e.g. b"+0100".
+_TZ_CACHE: dict[bytes, dt.timezone] = {}
+
 
 class Commit:
     """Class for handling commit objects."""
 
-    def __init__(self, commit_hash: str, tree_hash: str, timestamp: str, timezone: str):
+    __slots__ = ("hash", "tree_hash", "timestamp", "timezone")
+
+    def __init__(
+        self, commit_hash: bytes, tree_hash: bytes, timestamp: bytes, timezone: bytes
+    ):
         self.hash = commit_hash
         self.tree_hash = tree_hash
-
-        timezone = self._convert_timezone(timezone)
-        self.datetime = dt.datetime.fromtimestamp(int(timestamp), timezone)
+        self.timestamp = int(timestamp)
+        self.timezone = self._convert_timezone(timezone)
 
     @staticmethod
     def _convert_timezone(offset_str):
         """Concert timezone offset str."""
-        hours = int(offset_str[1:3])
-        if offset_str.startswith("-"):
-            hours = -hours
-        minutes = int(offset_str[3:])
+        timezone = _TZ_CACHE.get(offset_str)
+        if timezone is None:
+            hours = int(offset_str[1:3])
+            minutes = int(offset_str[3:])
+            if offset_str.startswith(b"-"):
+                hours, minutes = -hours, -minutes
+
+            timezone = dt.timezone(dt.timedelta(hours=hours, minutes=minutes))
+            _TZ_CACHE[offset_str] = timezone
+
+        return timezone
 
-        return dt.timezone(dt.timedelta(hours=hours, minutes=minutes))
+    @property
+    def datetime(self):
+        """Return commit time as timezone aware datetime."""
+        return dt.datetime.fromtimestamp(self.timestamp, self.timezone)
 
     def __gt__(self, other):
-        return self.datetime > other.datetime
+        return self.timestamp > other.timestamp
 
     def __str__(self):
-        return self.hash
+        return self.hash.decode("ascii")
@@ -4,13 +4,13 @@ import pathlib
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class DataFile:
     """Class for managing file metadata."""
 
     name: str
     folder: pathlib.Path
-    hash: str
+    hash: bytes
 
     @property
     def full_path(self):
@@ -1,11 +1,19 @@
 """Scan a git repo for data files."""
 
 import argparse
+import csv
+import itertools
 import logging
+import operator
+import os
 import pathlib
 import subprocess
+import sys
+import tempfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
+from git_scan.cat_file import BUFFER_SIZE, GitCatFile
 from git_scan.commit import Commit
 from git_scan.datafile import DataFile
 
@@ -22,10 +30,25 @@ EXTENSIONS = [
     "xlsb",
     "xml",
 ]
+EXTENSIONS_SUFFIXES = tuple(f".{extension}".encode() for extension in EXTENSIONS)
+
+# Tree entry modes, some tools write them zero-padded.
+TREE_MODES = {b"40000", b"040000"}
+GITLINK_MODES = {b"160000", b"0160000"}
 
 logger = logging.getLogger("GitScanner")
-tree_cache = {}
-files_seen = set()
+
+
+def _positive_int(value: str) -> int:
+    """Convert a command line value to an integer of at least 1."""
+    try:
+        number = int(value)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(f"invalid int value: {value!r}") from error
+
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
 
 
 def get_arguments():
@@ -42,114 +65,181 @@ def get_arguments():
         choices={"debug", "info", "warning", "error", "critical"},
         default="info",
     )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Number of processes for scanning trees.",
+        type=_positive_int,
+        default=os.cpu_count() or 1,
+    )
     return parser.parse_args()
 
 
-def scan_files(tree_hash: str, repo_path: pathlib.Path, sub_path: pathlib.Path) -> set:
-    """Get file paths that may contain data."""
-    logger.debug("Processing tree: %s", tree_hash)
+def parse_tree(payload: bytes):
+    """Yield (mode, name, binary object id) entries from a raw tree object."""
+    pos = 0
+    while pos < len(payload):
+        space = payload.index(b" ", pos)
+        nul = payload.index(b"\x00", space)
+        yield payload[pos:space], payload[space + 1 : nul], payload[nul + 1 : nul + 21]
+        pos = nul + 21
+
+
+def scan_files(
+    tree_hash: bytes,
+    cat: GitCatFile,
+    trees_seen: set,
+    files_seen: set,
+    blob_hashes: dict,
+) -> list:
+    """Get data files in a tree that were not seen before.
+
+    Blobs found under several paths share one hex hash from `blob_hashes`.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Processing tree: %s", tree_hash.decode())
+
+    # Walk the tree level by level, reading each level in one batch.
+    # Sub-trees walked before at the same path hold no new files.
+    data_files = []
+    level = [(b"", tree_hash)]
+    while level:
+        level = [tree for tree in level if tree not in trees_seen]
+        trees_seen.update(level)
+
+        next_level = []
+        payloads = cat.read_many([ohash for _, ohash in level])
+        for (prefix, _), payload in zip(level, payloads):
+            # Only hex the ids of entries that are used.
+            for mode, oname, oid in parse_tree(payload):
+                # Handle subtree.
+                if mode in TREE_MODES:
+                    next_level.append((prefix + oname + b"/", oid.hex().encode()))
+
+                # Handle file, skipping submodule commits.
+                elif mode not in GITLINK_MODES and oname.endswith(EXTENSIONS_SUFFIXES):
+                    path = prefix + oname
+                    if (path, oid) not in files_seen:
+                        files_seen.add((path, oid))
+                        data_files.append(
+                            DataFile(
+                                sys.intern(path.decode()),
+                                cat.repo_path,
+                                blob_hashes.setdefault(oid, oid.hex().encode()),
+                            )
+                        )
+
+        level = next_level
 
-    # Tree was parsed before and has no changes.
-    if tree_hash in tree_cache:
-        return []
+    logger.debug("Found %d data files.", len(data_files))
+    return data_files
 
-    output = ""
-    try:
-        git_pipe = subprocess.PIPE
-        result = subprocess.run(
-            ["git", "cat-file", "-p", tree_hash],
-            stdout=git_pipe,
-            stderr=git_pipe,
-            universal_newlines=True,
-            check=True,
-            cwd=repo_path,
-        )
-        output = result.stdout.strip()
 
-    except subprocess.CalledProcessError as error:
-        raise RuntimeError("Cannot read tree object: {tree_hash}") from error
+def _scan_range(tree_hashes: list, repo_path: pathlib.Path) -> list:
+    """Get (index, data file) pairs for consecutive root trees in a worker."""
+    trees_seen = set()
+    files_seen = set()
+    blob_hashes = {}
+    with GitCatFile(repo_path) as cat:
+        return [
+            (index, dfile)
+            for index, tree_hash in enumerate(tree_hashes)
+            for dfile in scan_files(tree_hash, cat, trees_seen, files_seen, blob_hashes)
+        ]
+
+
+def scan_commits(commits: list, repo_path: pathlib.Path, jobs: int) -> list:
+    """Get (commit, data file) pairs, each file with the first commit it appears in."""
+    logger.info("Scanning %d commits.", len(commits))
+
+    # Shard commits in order, consecutive commits share most sub-trees.
+    size = max(1, -(-len(commits) // jobs))
+    starts = range(0, len(commits), size)
+    shards = [
+        [commit.tree_hash for commit in commits[start : start + size]]
+        for start in starts
+    ]
+
+    if len(shards) < 2:
+        results = [_scan_range(shard, repo_path) for shard in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(
+                executor.map(
+                    _scan_range, shards, itertools.repeat(repo_path), chunksize=1
+                )
+            )
 
-    # Find data files in the tree.
-    # Recursively handle trees for subfolders.
+    # Shards are scanned separately, keep the first commit of each file.
+    files_seen = set()
     data_files = []
-    for line in output.split("\n"):
-        _, otype, ohash, oname = line.split(maxsplit=3)
-
-        # Handle subtree.
-        if otype == "tree":
-            data_files.extend(scan_files(ohash, repo_path, sub_path / oname))
-
-        # Handle file.
-        elif otype == "blob":
-            blob_id = f"{ohash}_{sub_path}_{oname}"
-            if blob_id in files_seen:
-                continue
+    for start, result in zip(starts, results):
+        for index, dfile in result:
+            file_id = (dfile.name, dfile.hash)
+            if file_id not in files_seen:
+                files_seen.add(file_id)
+                data_files.append((commits[start + index], dfile))
 
-            for extension in EXTENSIONS:
-                if line.endswith(extension):
-                    data_files.append(DataFile(oname, sub_path, ohash))
-                    files_seen.add(blob_id)
-                    break
-
-    logger.debug("Found %d data files.", len(data_files))
-    tree_cache[tree_hash] = data_files
     return data_files
 
 
-def parse_commit(commit_hash: str, repo_path: pathlib.Path) -> Commit:
+def parse_commit(commit_hash: bytes, payload: bytes) -> Commit:
     """Get commit information."""
-    logger.debug("Processing commit: %s", commit_hash)
-
-    output = ""
-    try:
-        git_pipe = subprocess.PIPE
-        result = subprocess.run(
-            ["git", "cat-file", "-p", commit_hash],
-            stdout=git_pipe,
-            stderr=git_pipe,
-            universal_newlines=True,
-            check=True,
-            cwd=repo_path,
-        )
-        output = result.stdout.strip()
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Processing commit: %s", commit_hash.decode())
 
-    except subprocess.CalledProcessError as error:
-        raise RuntimeError("Cannot read tree objects {tree_hash}") from error
-
-    tree_hash = timestamp = timezone = ""
-    for line in output.split("\n"):
-        if line.startswith("tree"):
+    tree_hash = timestamp = timezone = b""
+    for line in payload.split(b"\n"):
+        if line.startswith(b"tree "):
             tree_hash = line.split()[1]
 
-        elif line.startswith("committer"):
+        elif line.startswith(b"committer "):
             parts = line.split()
             timestamp = parts[-2]
             timezone = parts[-1]
 
+        # Headers end at the first empty line.
+        elif not line:
+            break
+
     return Commit(commit_hash, tree_hash, timestamp, timezone)
 
 
 def get_all_objects(repo_path: pathlib.Path) -> dict:
-    """Lists all object in the repository."""
+    """Lists all commit objects in the repository."""
     logger.info("Listing objects in the repository.")
-    git_pipe = subprocess.PIPE
 
+    # Stream the listing instead of buffering it in memory. Errors go to a
+    # file, a full stderr pipe would block git while stdout is being read.
     objects = defaultdict(list)
-    try:
-        result = subprocess.run(
-            ["git", "cat-file", "--batch-check", "--batch-all-objects"],
-            stdout=git_pipe,
-            stderr=git_pipe,
-            universal_newlines=True,
-            check=True,
+    with (
+        tempfile.TemporaryFile() as errors,
+        subprocess.Popen(
+            [
+                "git",
+                "cat-file",
+                "--batch-check=%(objecttype) %(objectname)",
+                "--batch-all-objects",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=errors,
+            bufsize=BUFFER_SIZE,
             cwd=repo_path,
+        ) as process,
+    ):
+        # Only commits are scanned, skip all other objects.
+        for line in process.stdout:
+            if line.startswith(b"commit "):
+                objects["commit"].append(line[7:-1])
+
+        process.wait()
+        errors.seek(0)
+        stderr = errors.read()
+
+    if process.returncode:
+        error = subprocess.CalledProcessError(
+            process.returncode, process.args, stderr=stderr
         )
-
-        for line in result.stdout.strip().split("\n"):
-            ohash, otype, _ = line.split()
-            objects[otype].append(ohash)
-
-    except subprocess.CalledProcessError as error:
         raise RuntimeError("Cannot list trees objects form the repository") from error
 
     return objects
@@ -158,12 +248,17 @@ def get_all_objects(repo_path: pathlib.Path) -> dict:
 def get_commits(repo_objects: dict, repo_path: pathlib.Path) -> None:
     """Get all commit objects from the repository."""
     logger.info("Found %d commits.", len(repo_objects["commit"]))
-    commits = []
-    for commit_hash in repo_objects["commit"]:
-        commits.append(parse_commit(commit_hash, repo_path))
+
+    commit_hashes = repo_objects["commit"]
+    with GitCatFile(repo_path) as cat:
+        payloads = cat.read_many(commit_hashes)
+        commits = [
+            parse_commit(commit_hash, payload)
+            for commit_hash, payload in zip(commit_hashes, payloads)
+        ]
 
     # Sort by timestamp.
-    commits.sort()
+    commits.sort(key=operator.attrgetter("timestamp"))
     return commits
 
 
@@ -182,26 +277,28 @@ def main():
 
     logger.info("Processing commit objects.")
     repo_objects = get_all_objects(repo_path)
-    commits = get_commits(repo_objects, repo_path)
 
-    data_files = {}
-    for commit in commits:
-        matches = scan_files(commit.tree_hash, repo_path, repo_path)
-        if matches:
-            data_files[commit] = matches
+    commits = get_commits(repo_objects, repo_path)
+    data_files = scan_commits(commits, repo_path, args.jobs)
 
-    # Convert to set to remove duplicates.
     logger.info("Found %d data files.", len(data_files))
     logger.info("Finished scanning.")
 
     # Write output as CSV.
-    with open(args.output, "w", encoding="utf8") as out_file:
-        out_file.write("file_path,file_hash,commit_hash,commit_time\n")
-        for commit, data_files in data_files.items():
-            for dfile in data_files:
-                out_file.write(
-                    f"{dfile.full_path},{dfile.hash},{commit.hash},{commit.datetime}\n"
-                )
+    with open(
+        args.output, "w", encoding="utf8", newline="", buffering=BUFFER_SIZE
+    ) as out_file:
+        writer = csv.writer(out_file, lineterminator="\n")
+        writer.writerow(("file_path", "file_hash", "commit_hash", "commit_time"))
+        writer.writerows(
+            (
+                dfile.full_path,
+                dfile.hash.decode("ascii"),
+                commit.hash.decode("ascii"),
+                commit.datetime,
+            )
+            for commit, dfile in data_files
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,52 @@
+"""Shared fixtures for the git-scan tests."""
+
+import subprocess
+import threading
+
+import pytest
+
+
+def run_with_timeout(func, timeout: float = 30):
+    """Run func in a thread, fail when it hangs, return the raised error if any."""
+    outcome = {}
+
+    def target():
+        try:
+            func()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            outcome["error"] = error
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), f"Call did not finish within {timeout} seconds"
+    return outcome.get("error")
+
+
+@pytest.fixture
+def make_repo(tmp_path):
+    """Return a function that builds a repository from `git fast-import` input."""
+
+    def _make_repo(stream: bytes):
+        repo_path = tmp_path / "repo"
+        subprocess.run(["git", "init", "-q", str(repo_path)], check=True)
+        subprocess.run(
+            ["git", "fast-import", "--quiet"], input=stream, cwd=repo_path, check=True
+        )
+        return repo_path
+
+    return _make_repo
+
+
+def fast_import_commit(paths: list, timestamp: int = 1700000000) -> bytes:
+    """Return fast-import input for one commit holding `paths` as small blobs."""
+    stream = [b"blob\nmark :1\ndata 2\nx\n"]
+    stream.append(
+        f"commit refs/heads/master\ncommitter t <t@t> {timestamp} +0000\n".encode()
+        + b"data 4\ninit\n"
+    )
+    for path in paths:
+        if isinstance(path, str):
+            path = path.encode()
+        stream.append(b"M 100644 :1 " + path + b"\n")
+    return b"".join(stream)
@@ -0,0 +1,64 @@
+"""Tests for the GitCatFile class."""
+
+import subprocess
+
+import pytest
+from conftest import fast_import_commit, run_with_timeout
+
+from git_scan.cat_file import GitCatFile
+
+
+def _tree_hashes(repo_path) -> list:
+    """Return the hashes of all sub-trees in HEAD."""
+    result = subprocess.run(
+        ["git", "ls-tree", "-d", "HEAD"],
+        cwd=repo_path,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return [line.split()[2] for line in result.stdout.splitlines()]
+
+
+@pytest.fixture
+def large_repo(make_repo):
+    """Repository with 60 sub-trees of 400 files each."""
+    paths = [
+        f"d{folder:02}/f{number}.txt" for folder in range(60) for number in range(400)
+    ]
+    return make_repo(fast_import_commit(paths))
+
+
+def test_read_many_keeps_order(large_repo):
+    hashes = _tree_hashes(large_repo)
+    with GitCatFile(large_repo) as cat:
+        payloads = list(cat.read_many(hashes))
+        # A second batch after a full one still lines up.
+        assert list(cat.read_many(hashes[:2])) == payloads[:2]
+
+    assert len(payloads) == len(hashes)
+    assert all(b"f399.txt" in payload for payload in payloads)
+
+
+def test_read_many_missing_object(large_repo):
+    hashes = _tree_hashes(large_repo)[:1] + [b"0" * 40]
+
+    def read():
+        with GitCatFile(large_repo) as cat:
+            list(cat.read_many(hashes))
+
+    error = run_with_timeout(read)
+    assert isinstance(error, RuntimeError)
+
+
+@pytest.mark.parametrize("count", [2, 60, 200])
+def test_close_after_partial_read(large_repo, count):
+    """Stopping partway must not leave close() waiting on unread git output."""
+    hashes = (_tree_hashes(large_repo) * 4)[:count]
+
+    def read():
+        with GitCatFile(large_repo) as cat:
+            for _ in cat.read_many(hashes):
+                raise ValueError("stop")
+
+    error = run_with_timeout(read)
+    assert isinstance(error, ValueError)
@@ -0,0 +1,104 @@
+"""Tests for scanning repositories."""
+
+import subprocess
+import sys
+
+import pytest
+from conftest import fast_import_commit, run_with_timeout
+
+from git_scan.git_scan import (
+    get_all_objects,
+    get_arguments,
+    get_commits,
+    scan_commits,
+)
+
+
+def _scan(repo_path, jobs: int = 1) -> list:
+    commits = get_commits(get_all_objects(repo_path), repo_path)
+    return scan_commits(commits, repo_path, jobs)
+
+
+def test_scan_finds_data_files(make_repo):
+    repo_path = make_repo(fast_import_commit(["a.csv", "b.txt", "sub/c.xlsx", "d_csv"]))
+    names = sorted(dfile.name for _, dfile in _scan(repo_path))
+    assert names == ["a.csv", "sub/c.xlsx"]
+
+
+def test_scan_non_utf8_name_raises(make_repo):
+    """A decode error in a large tree level must raise instead of hanging."""
+    paths = [
+        f"d{folder:02}/f{number}.txt" for folder in range(60) for number in range(400)
+    ]
+    paths.append(b'"d00/\\377\\376bad.csv"')
+    repo_path = make_repo(fast_import_commit(paths))
+
+    error = run_with_timeout(lambda: _scan(repo_path))
+    assert isinstance(error, UnicodeDecodeError)
+
+
+IDENTITY = ("-c", "user.name=t", "-c", "user.email=t@t")
+
+
+def _git(repo_path, *args, stdin: bytes = b"") -> bytes:
+    result = subprocess.run(
+        ["git", *args], input=stdin, cwd=repo_path, stdout=subprocess.PIPE, check=True
+    )
+    return result.stdout.strip()
+
+
+def test_scan_zero_padded_modes(make_repo):
+    """Trees written with zero-padded modes are still walked, gitlinks skipped."""
+    repo_path = make_repo(fast_import_commit(["sub/a.csv"]))
+    sub_tree = _git(repo_path, "rev-parse", "HEAD:sub")
+    commit = _git(repo_path, "rev-parse", "HEAD")
+
+    # Git itself normalises modes, so write the raw tree object.
+    entries = [
+        b"040000 padded\x00" + bytes.fromhex(sub_tree.decode()),
+        b"0160000 module.csv\x00" + bytes.fromhex(commit.decode()),
+    ]
+    root_tree = _git(
+        repo_path,
+        "hash-object",
+        "-t",
+        "tree",
+        "-w",
+        "--literally",
+        "--stdin",
+        stdin=b"".join(entries),
+    )
+    _git(
+        repo_path,
+        "update-ref",
+        "HEAD",
+        _git(repo_path, *IDENTITY, "commit-tree", "-m", "x", root_tree.decode()),
+    )
+
+    names = sorted(dfile.name for _, dfile in _scan(repo_path))
+    assert names == ["padded/a.csv", "sub/a.csv"]
+
+
+@pytest.mark.parametrize("jobs", ["0", "-2", "two"])
+def test_jobs_must_be_positive(monkeypatch, jobs):
+    monkeypatch.setattr(sys, "argv", ["git-scan", "-j", jobs])
+    with pytest.raises(SystemExit):
+        get_arguments()
+
+
+def test_scan_multiple_jobs(make_repo):
+    """Shards keep the first commit of a file scanned in an earlier range."""
+    stream = fast_import_commit(["a.csv"], timestamp=1)
+    stream += fast_import_commit(["a.csv", "b.csv"], timestamp=2)
+    repo_path = make_repo(stream)
+
+    rows = sorted(
+        (dfile.name, commit.timestamp) for commit, dfile in _scan(repo_path, 2)
+    )
+    assert rows == [("a.csv", 1), ("b.csv", 2)]
+
+
+def test_list_objects_outside_repository(tmp_path):
+    with pytest.raises(RuntimeError) as error:
+        get_all_objects(tmp_path)
+    assert b"not a git repository" in error.value.__cause__.stderr